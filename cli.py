@@ -0,0 +1,15 @@
+"""
+CS122A Final Project - thin command-line entry point
+
+Usage: python3 cli.py <functionName> [params...]
+
+Runs the same commands as `python3 project.py ...`. A script is compiled
+from source on every run, while an imported module is loaded from its
+cached bytecode in __pycache__, so short invocations (e.g. cron jobs)
+start faster through this file.
+"""
+
+from project import main
+
+if __name__ == "__main__":
+    main()